@@ -1,35 +1,66 @@
 """The Young Israel West Hartford Calendar integration."""
 from __future__ import annotations
 import logging
+from bisect import bisect_right
 from datetime import timedelta
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant, callback
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
-from homeassistant.helpers.event import async_track_point_in_time
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.helpers.event import async_call_later, async_track_point_in_time
 from homeassistant.util import dt as dt_util
-from homeassistant.const import EVENT_HOMEASSISTANT_STARTED
 
-from .const import DOMAIN
+from .const import DOMAIN, StatePack
 from .scraper import YIWHScraper, DummyScraper
 
 _LOGGER = logging.getLogger(__name__)
 PLATFORMS: list[Platform] = [Platform.SENSOR]
+MIDNIGHT_PADDING_SECONDS = 1
 
 
-def get_next_midnight():
-    """Get timedelta until next midnight."""
+def seconds_until_midnight() -> float:
+    """Get seconds until next midnight."""
     now = dt_util.now()
-    next_midnight = (now + timedelta(days=1)).replace(
-        hour=0, minute=0, second=0, microsecond=0
-    )
-    return next_midnight
+    seconds = 86400 - (now.hour * 3600 + now.minute * 60 + now.second + now.microsecond / 1e6)
+    # Wall clock arithmetic is off by the DST shift on transition days
+    midnight = now + timedelta(seconds=seconds)
+    seconds += (now.utcoffset() - midnight.utcoffset()).total_seconds()
+    # Pad well past timer rounding and clock drift, so the refresh never runs just before midnight
+    return seconds + MIDNIGHT_PADDING_SECONDS
+
+
+def split_times(times, now):
+    """Return the last time at or before now and the first time after it."""
+    # The times are sorted, so one bisection splits them into past and future
+    index = bisect_right(times, now)
+    past = times[index - 1] if index > 0 else None
+    future = times[index] if index < len(times) else None
+    return past, future
+
+
+def compute_state_pack(data, now) -> StatePack:
+    """Compute every sensor value at once from the coordinator data."""
+    if not data:
+        return StatePack(None, None, None, None)
+
+    last_candle_lighting, next_candle_lighting = split_times(data.candle_times, now)
+    last_havdalah, next_havdalah = split_times(data.havdalah_times, now)
+    # Melacha is forbidden from candle lighting until the havdalah that follows it
+    issur_melacha = last_candle_lighting > last_havdalah if last_candle_lighting and last_havdalah else None
+    next_transition = min((time for time in (next_candle_lighting, next_havdalah) if time), default=None)
+    return StatePack(next_candle_lighting, last_candle_lighting, next_havdalah, last_havdalah, issur_melacha, next_transition)
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     coordinator = MidnightCoordinator(hass)
-    await coordinator.async_config_entry_first_refresh()
+    try:
+        await coordinator.async_config_entry_first_refresh()
+    except Exception:
+        # A retry builds a new coordinator, so release this scraper's worker thread now
+        coordinator.scraper.close()
+        raise
+    coordinator.schedule_next_midnight()
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     return True
@@ -38,7 +69,9 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator.cancel_timers()
+        coordinator.scraper.close()
 
     return unload_ok
 
@@ -46,34 +79,91 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 class MidnightCoordinator(DataUpdateCoordinator):
     def __init__(self, hass: HomeAssistant):
         super().__init__(hass, _LOGGER, name=DOMAIN)
-        self.scraper = YIWHScraper()
+        self.scraper = YIWHScraper(hass)
         # self.scraper = DummyScraper()
-        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STARTED, self._handle_startup)
+        self._unsub_midnight = None
+        self._unsub_transition = None
+        self._unloaded = False
+        # Sensor values derived from data, computed once here and read by every sensor
+        self.state_pack = None
 
     @callback
-    async def _handle_startup(self, event):
-        # Run update once at startup
-        await self._async_update_data()
-
-        # Schedule the first midnight update
-        self._schedule_next_midnight()
-
-    def _schedule_next_midnight(self):
+    def schedule_next_midnight(self):
         """Schedule the next update at midnight."""
-        next_midnight = get_next_midnight()
-        async_track_point_in_time(
+        if self._unloaded:
+            # The entry was unloaded while a refresh was running
+            return
+
+        delay = seconds_until_midnight()
+        self._unsub_midnight = async_call_later(
             self.hass,
+            delay,
             self._handle_midnight,
-            next_midnight,
         )
-        _LOGGER.debug(f"YIWeHa: Coordinator scheduled next midnight for {next_midnight}")
+        _LOGGER.debug("YIWeHa: Coordinator scheduled next midnight in %s seconds", delay)
+
+    @callback
+    def cancel_next_midnight(self):
+        """Cancel the pending midnight update."""
+        if self._unsub_midnight:
+            self._unsub_midnight()
+            self._unsub_midnight = None
+
+    @callback
+    def schedule_next_transition(self):
+        """Schedule the state pack to move on when the next event passes."""
+        self.cancel_next_transition()
+        if self._unloaded or self.state_pack is None or self.state_pack.next_transition is None:
+            return
+
+        self._unsub_transition = async_track_point_in_time(
+            self.hass,
+            self._handle_transition,
+            self.state_pack.next_transition,
+        )
+        _LOGGER.debug("YIWeHa: Coordinator scheduled next transition at %s", self.state_pack.next_transition)
+
+    @callback
+    def cancel_next_transition(self):
+        """Cancel the pending transition update."""
+        if self._unsub_transition:
+            self._unsub_transition()
+            self._unsub_transition = None
+
+    @callback
+    def cancel_timers(self):
+        """Cancel every pending timer and stop scheduling new ones."""
+        self._unloaded = True
+        self.cancel_next_midnight()
+        self.cancel_next_transition()
+
+    @callback
+    def _handle_transition(self, _):
+        """Move the state pack past the event and push it to every sensor at once."""
+        self._unsub_transition = None
+        self.update_state_pack()
+        self.async_update_listeners()
+        self.schedule_next_transition()
+
+    @callback
+    def update_state_pack(self) -> None:
+        """Recompute the state pack now that an event has passed."""
+        self.state_pack = compute_state_pack(self.data, dt_util.now())
+        _LOGGER.debug("YIWeHa: State pack updated to %s", self.state_pack)
 
     async def _handle_midnight(self, _):
-        await self._async_update_data()
-        self._schedule_next_midnight()
+        await self.async_refresh()
+        self.schedule_next_midnight()
 
     async def _async_update_data(self):
         _LOGGER.debug("YIWeHa: Scraper is updating...")
-        data = await self.hass.async_add_executor_job(self.scraper.scrape_calendar)
-        self.async_set_updated_data(data)
+        try:
+            data = await self.scraper.scrape_calendar()
+        except ConnectionError as error:
+            raise UpdateFailed(str(error)) from error
+
+        # Ready before the listeners run, so every sensor reads the same pack
+        self.state_pack = compute_state_pack(data, dt_util.now())
+        self.schedule_next_transition()
         _LOGGER.debug("YIWeHa: Updated Coordinator data")
+        return data
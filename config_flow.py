@@ -4,7 +4,6 @@ from __future__ import annotations
 from typing import Any
 import voluptuous as vol
 import logging
-from functools import partial
 
 from homeassistant import config_entries
 from homeassistant.core import HomeAssistant
@@ -18,21 +17,15 @@ _LOGGER = logging.getLogger(__name__)
 
 STEP_USER_DATA_SCHEMA = vol.Schema({})
 
-def _validate_connection(scraper: YIWHScraper) -> tuple[list, list]:
-    """Run the scraper in a separate thread."""
-    return scraper.scrape_calendar()
-
 async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
     """Validate the user input allows us to connect."""
     _LOGGER.debug("YIWeHa: Starting validation of YIWeHa Calendar input")
-    scraper = YIWHScraper()
+    scraper = YIWHScraper(hass)
     
     try:
         _LOGGER.debug("YIWeHa: Attempting to scrape calendar")
-        # Run the blocking scraper in an executor
-        candle_lighting, havdalah = await hass.async_add_executor_job(
-            _validate_connection, scraper
-        )
+        result = await scraper.scrape_calendar()
+        candle_lighting, havdalah = result.candle_lighting, result.havdalah
         
         if not candle_lighting and not havdalah:
             _LOGGER.error("YIWeHa: No calendar events found in the response")
@@ -48,6 +41,8 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str,
     except Exception as error:
         _LOGGER.exception("YIWeHa: Unexpected error during calendar validation")
         raise UnknownError from error
+    finally:
+        scraper.close()
 
     return {"title": "Young Israel West Hartford Calendar"}
 
@@ -1,2 +1,17 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+
 DOMAIN = "yiweha"
 
+
+@dataclass(slots=True, frozen=True)
+class StatePack:
+    """Sensor values derived from one pass over the coordinator data."""
+    next_candle_lighting: datetime | None
+    last_candle_lighting: datetime | None
+    next_havdalah: datetime | None
+    last_havdalah: datetime | None
+    issur_melacha: bool | None = None
+    next_transition: datetime | None = None
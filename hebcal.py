@@ -1,29 +1,33 @@
-import requests
+import asyncio
+import logging
 from datetime import datetime, timedelta
 
+import aiohttp
+
+_LOGGER = logging.getLogger(__name__)
+
 
 def get_datetime(string):
-    try:
-        return datetime.strptime(string, "%Y-%m-%dT%H:%M:%S%z")
-    except:
-        return datetime.strptime(string, "%Y-%m-%d")
+    # Handles both "YYYY-MM-DD" and "YYYY-MM-DDTHH:MM:SS+HH:MM"
+    return datetime.fromisoformat(string)
 
 
 class HebCal:
     BASE_URL = "https://www.hebcal.com/hebcal"
 
-    def __init__(self, zipcode):
+    def __init__(self, session: aiohttp.ClientSession, zipcode):
+        self._session = session
         self.zipcode = zipcode
 
-    def get_zmanim(self, days_before=7, days_after=7):
-        now = datetime.now().date()
-        start_date = now - timedelta(days=days_before)
-        end_date = now + timedelta(days=days_after)
+    async def get_zmanim(self, today, days_before=7, days_after=7):
+        # The caller supplies today, so the window follows Home Assistant's time zone
+        start_date = today - timedelta(days=days_before)
+        end_date = today + timedelta(days=days_after)
         params = {
             "v": 1,
             "cfg": "json",
-            "start": start_date,
-            "end": end_date,
+            "start": start_date.isoformat(),
+            "end": end_date.isoformat(),
             "zip": self.zipcode,
             "m": 50,  # minutes after sunset for havdalah (adjust if needed)
             "maj": "on",  # major holidays
@@ -31,17 +35,19 @@ class HebCal:
             "mod": "on",  # modern holidays
         }
 
-        response = requests.get(self.BASE_URL, params=params)
-        if response.status_code != 200:
-            print(f"Failed to get data for dates")
-            return
+        async with self._session.get(
+            self.BASE_URL, params=params, timeout=aiohttp.ClientTimeout(total=10)
+        ) as response:
+            if response.status != 200:
+                _LOGGER.error("YIWeHa: Failed to fetch zmanim. Status code: %d", response.status)
+                raise ConnectionError(f"YIWeHa: HTTP {response.status}: Failed to fetch zmanim")
+
+            data = await response.json()
 
         candle_lightings = []
         havdalahs = []
-        data = response.json()
         items = data["items"]
         for item in items:
-            print(item)
             date = get_datetime(item["date"])
             if item["category"] == "candles":
                 candle_lightings.append(date)
@@ -52,5 +58,9 @@ class HebCal:
 
 
 if __name__ == "__main__":
-    for item in HebCal("06117").get_zmanim():
-        print(item)
+    async def main():
+        async with aiohttp.ClientSession() as session:
+            for item in await HebCal(session, "06117").get_zmanim(datetime.now().date()):
+                print(item)
+
+    asyncio.run(main())